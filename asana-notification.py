@@ -1,4 +1,6 @@
 import argparse
+import bisect
+import collections
 import requests
 import datetime
 import os
@@ -9,10 +11,18 @@ import threading
 import schedule
 import time
 import json
+import hashlib
+import hmac
+import tempfile
+import smtplib
+import uuid
 import google.auth.exceptions
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.http import MediaIoBaseUpload
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from email.mime.text import MIMEText
+from urllib.parse import urlsplit, parse_qs
 from http.server import HTTPServer, BaseHTTPRequestHandler, ThreadingHTTPServer
 from google.auth.transport.requests import Request
 
@@ -45,6 +55,7 @@ logging.getLogger().addHandler(memory_handler)
 parser = argparse.ArgumentParser()
 parser.add_argument('--max-projects', type=int, help='Maximum number of projects to process')
 parser.add_argument('--run-now', action='store_true', help='Run the script immediately')
+parser.add_argument('--resume', action='store_true', help='Run immediately, continuing from the last checkpoint')
 args = None
 
 # Get environment variables. Using `get` prevents import errors during testing
@@ -58,6 +69,52 @@ excluded_projects = ['310779989024082', '1111864722010765', '1204430533460894']
 # If modifying these SCOPES, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 
+# Checkpoint used to resume interrupted runs and how long it stays valid
+checkpoint_file = os.environ.get('CHECKPOINT_FILE', 'checkpoint.json')
+checkpoint_max_age = float(os.environ.get('CHECKPOINT_MAX_AGE_HOURS', '12'))
+
+# How soon, and how often, a failed scheduled run is retried from its checkpoint
+run_retry_minutes = float(os.environ.get('RUN_RETRY_MINUTES', '15'))
+run_retry_limit = int(os.environ.get('RUN_RETRY_LIMIT', '3'))
+
+# Held by the active run; runs share the checkpoint files, so they never overlap
+run_lock = threading.Lock()
+
+# Asana API location, request timeouts (seconds) and the overall run budget
+asana_api_url = os.environ.get('ASANA_API_URL', 'https://app.asana.com/api/1.0')
+asana_connect_timeout = float(os.environ.get('ASANA_CONNECT_TIMEOUT', '5'))
+asana_read_timeout = float(os.environ.get('ASANA_READ_TIMEOUT', '30'))
+run_deadline = float(os.environ.get('RUN_DEADLINE_SECONDS', '2700'))
+
+# Page requests slower than this latency percentile are hedged
+hedge_percentile = float(os.environ.get('HEDGE_PERCENTILE', '0.95'))
+hedge_min_samples = 20
+
+# Watched projects are saved so webhooks keep working after a restart
+watched_projects_file = os.environ.get('WATCHED_PROJECTS_FILE', 'watched-projects.json')
+
+# Asana webhook secrets, one per watched project, stored at the handshake
+webhook_secrets_file = os.environ.get('WEBHOOK_SECRETS_FILE', 'webhook-secrets.json')
+webhook_secrets_lock = threading.Lock()
+
+# Delivery queue settings; reports are delivered in the background
+delivery_queue_dir = os.environ.get('DELIVERY_QUEUE_DIR', 'delivery-queue')
+delivery_sinks = [sink.strip() for sink in os.environ.get('DELIVERY_SINKS', 'gmail').split(',') if sink.strip()]
+delivery_max_attempts = int(os.environ.get('DELIVERY_MAX_ATTEMPTS', '5'))
+delivery_backoff = int(os.environ.get('DELIVERY_BACKOFF_SECONDS', '30'))
+delivery_concurrency = int(os.environ.get('DELIVERY_CONCURRENCY', '4'))
+delivery_wakeup = threading.Event()
+
+# Gmail's and the SMTP server's maximum message sizes and estimates used when
+# splitting reports
+GMAIL_MAX_MESSAGE_BYTES = 25 * 1024 * 1024
+SMTP_MAX_MESSAGE_BYTES = int(os.environ.get('SMTP_MAX_MESSAGE_BYTES', str(10 * 1024 * 1024)))
+EMAIL_ROW_BYTES = 500
+EMAIL_PROJECT_BYTES = 2048
+
+# Field names of the (name, due date, assignee, url, project) report tuples
+REPORT_FIELDS = ('name', 'due_on', 'assignee', 'url', 'project')
+
 # Track progress information for the web UI
 script_progress = {
     'total_projects': 0,
@@ -66,6 +123,8 @@ script_progress = {
     'complete': False,
     'last_run': None,
     'error': None,
+    'partial': False,
+    'unfetched_projects': [],
 }
 
 
@@ -101,15 +160,33 @@ def fetch_commits():
 
     return commits
 
-def build_email_html(tasks, milestones):
-    """Create the HTML body for the email."""
+def report_subject(unfetched=None, part=None):
+    """Return the email subject, flagging partial and split reports.
+
+    ``part`` is a ``(number, total)`` pair for one message of a split report.
+    """
+    subject = 'Overdue Asana Tasks and Milestones'
+    if unfetched:
+        subject += ' (partial)'
+    if part is not None:
+        subject += ' (part {}/{})'.format(*part)
+    return subject
+
+
+def iter_email_html(tasks, milestones, unfetched=None):
+    """Yield the HTML body for the email in small chunks.
+
+    ``unfetched`` lists projects the run could not fetch; when given, the
+    report starts with a notice that it is partial.
+    """
     projects_dict = {}
+    milestone_set = set(milestones)
 
     # Organize tasks and milestones by projects
     for task_name, task_due_date, assignee_name, task_url, project_name in tasks + milestones:
         if project_name not in projects_dict:
             projects_dict[project_name] = []
-        item_type = 'Milestone' if (task_name, task_due_date, assignee_name, task_url, project_name) in milestones else 'Task'
+        item_type = 'Milestone' if (task_name, task_due_date, assignee_name, task_url, project_name) in milestone_set else 'Task'
         projects_dict[project_name].append((item_type, task_name, task_due_date, assignee_name, task_url))
 
     # Sort projects alphabetically for stable output
@@ -121,7 +198,7 @@ def build_email_html(tasks, milestones):
         milestone_count = sum(1 for i in project_items if i[0] == 'Milestone')
         summary[project_name] = (task_count, milestone_count)
 
-    message_text = (
+    yield (
         '<div style="font-family:Arial, sans-serif; color:#000000; background-color:#ffffff;">'
         '<style>'
         'table{border-collapse:collapse;width:100%;max-width:600px;}'
@@ -131,29 +208,35 @@ def build_email_html(tasks, milestones):
         '</style>'
     )
 
+    if unfetched:
+        yield '<p style="color:#a94442;"><strong>Partial report:</strong> these projects could not be fetched:</p><ul>'
+        for project_name in unfetched:
+            yield f'<li>{project_name}</li>'
+        yield '</ul>'
+
     if summary:
-        message_text += '<h1>Summary</h1><ul>'
+        yield '<h1>Summary</h1><ul>'
         for name in sorted(summary.keys()):
             tasks_total, milestones_total = summary[name]
             total = tasks_total + milestones_total
-            message_text += f'<li>{name}: {total} overdue ({tasks_total} tasks, {milestones_total} milestones)</li>'
-        message_text += '</ul>'
+            yield f'<li>{name}: {total} overdue ({tasks_total} tasks, {milestones_total} milestones)</li>'
+        yield '</ul>'
 
     # Add table of contents linking to each project
     if sorted_projects:
-        message_text += '<h1>Table of Contents</h1><ul>'
+        yield '<h1>Table of Contents</h1><ul>'
         for project_name, _ in sorted_projects:
             anchor = project_name.lower().replace(" ", "-")
-            message_text += f'<li><a href="#{anchor}">{project_name}</a></li>'
-        message_text += '</ul>'
+            yield f'<li><a href="#{anchor}">{project_name}</a></li>'
+        yield '</ul>'
 
     for project_name, project_items in sorted_projects:
         if len(project_items) == 0:
             continue  # Skip projects without tasks or milestones
 
         anchor = project_name.lower().replace(' ', '-')
-        tasks_table = f'<a name="{anchor}"></a><h1>{project_name} Tasks</h1>'
-        tasks_table += '''
+        yield f'<a name="{anchor}"></a><h1>{project_name} Tasks</h1>'
+        yield '''
         <table style="border:1px solid #cccccc; border-collapse:collapse; width:100%; max-width:600px;">
             <tr>
                 <th style="text-align:left !important; font-weight:bold; border:1px solid #cccccc; padding:8px; background-color:#f0f0f0;">Type</th>
@@ -171,7 +254,7 @@ def build_email_html(tasks, milestones):
                 row_color = '#f8d7da'
             elif days_overdue > 7:
                 row_color = '#fff3cd'
-            tasks_table += f'''
+            yield f'''
             <tr style="background-color:{row_color};">
                 <td style="border:1px solid #cccccc; padding:8px;">{item_type}</td>
                 <td style="border:1px solid #cccccc; padding:8px;"><a href="{task_url}">{task_name}</a></td>
@@ -180,21 +263,286 @@ def build_email_html(tasks, milestones):
                 <td style="border:1px solid #cccccc; padding:8px;">{assignee_name}</td>
             </tr>'''
 
-        tasks_table += '</table>'
+        yield '</table>'
+
+    if not sorted_projects:
+        yield '<p>No overdue tasks or milestones found.</p>'
+
+    yield '<hr/><p><a href="http://localhost:8080/run">View online</a></p>'
+    yield '<p style="font-size:12px;color:#666;">Automated Asana report</p>'
+    yield '</div>'
+
+
+def build_email_html(tasks, milestones, unfetched=None):
+    """Create the HTML body for the email."""
+    return ''.join(iter_email_html(tasks, milestones, unfetched))
+
+
+# Overdue-age buckets, matching the row colours used in the email
+OVERDUE_BUCKETS = [('1-7', 1), ('8-14', 8), ('15+', 15)]
+
+
+def overdue_bucket(days_overdue):
+    """Return the bucket label for an item that is ``days_overdue`` late."""
+    label = OVERDUE_BUCKETS[0][0]
+    for name, lower in OVERDUE_BUCKETS:
+        if days_overdue >= lower:
+            label = name
+    return label
+
+
+def task_gid_from_url(task_url):
+    """Return the task GID at the end of an Asana permalink URL."""
+    segments = [part for part in urlsplit(task_url or '').path.split('/') if part and part != 'f']
+    return segments[-1] if segments else None
+
+
+class OverdueIndex:
+    """In-memory, indexed copy of the current overdue items.
+
+    Every item is stored in one list per ``(assignee, project)`` key, with
+    ``None`` standing for "any". Each list is ordered by due date (oldest
+    first) so ``min_days`` is a bisect and a page is a slice of that list.
+    The fields that never change are serialised to JSON once when an item is
+    added; ``days_overdue`` and ``bucket`` are filled in at query time so they
+    stay correct for the whole week the index is served. ``load`` replaces
+    the contents after a full run; ``update_task`` and ``remove_task`` apply
+    webhook changes in between.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generated_at = None
+        self._keys = {}
+        self._entries = {}
+        self._by_gid = {}
+
+    @staticmethod
+    def _entry(item_type, item):
+        """Return ``(identity, sort_key, assignee, payload)`` for one item."""
+        task_name, task_due_date, assignee_name, task_url, project_name = item
+        record = {
+            'type': item_type,
+            'name': task_name,
+            'due_on': task_due_date.isoformat(),
+            'assignee': assignee_name,
+            'url': task_url,
+            'project': project_name,
+        }
+        sort_key = (task_due_date.toordinal(), project_name, task_name or '', task_url or '')
+        # Leave the object open so the age fields can be appended per query
+        return (task_url, project_name), sort_key, assignee_name, json.dumps(record)[:-1]
+
+    def _add(self, item_type, item):
+        identity, sort_key, assignee_name, payload = self._entry(item_type, item)
+        project_name = identity[1]
+        if identity in self._entries:
+            self._remove(identity)
+        for key in ((assignee_name, project_name), (assignee_name, None), (None, project_name), (None, None)):
+            slot = self._keys.setdefault(key, {'keys': [], 'payloads': []})
+            position = bisect.bisect_left(slot['keys'], sort_key)
+            slot['keys'].insert(position, sort_key)
+            slot['payloads'].insert(position, payload)
+        self._entries[identity] = (sort_key, assignee_name)
+        self._by_gid.setdefault(task_gid_from_url(identity[0]), set()).add(identity)
+
+    def _remove(self, identity):
+        sort_key, assignee_name = self._entries.pop(identity)
+        task_url, project_name = identity
+        for key in ((assignee_name, project_name), (assignee_name, None), (None, project_name), (None, None)):
+            slot = self._keys[key]
+            position = bisect.bisect_left(slot['keys'], sort_key)
+            del slot['keys'][position]
+            del slot['payloads'][position]
+            if not slot['keys']:
+                del self._keys[key]
+        gid = task_gid_from_url(task_url)
+        self._by_gid[gid].discard(identity)
+        if not self._by_gid[gid]:
+            del self._by_gid[gid]
+
+    def load(self, tasks, milestones):
+        """Replace the index contents with the given tasks and milestones.
+
+        The new lists are built and sorted without holding the lock, which is
+        only taken to swap them in, so queries are not blocked meanwhile.
+        """
+        latest = {}
+        for item_type, items in (('Task', tasks), ('Milestone', milestones)):
+            for item in items:
+                identity, sort_key, assignee_name, payload = self._entry(item_type, item)
+                latest[identity] = (sort_key, assignee_name, payload)
+
+        keys, entries, by_gid = {}, {}, {}
+        for identity, (sort_key, assignee_name, payload) in sorted(latest.items(), key=lambda e: e[1][0]):
+            project_name = identity[1]
+            for key in ((assignee_name, project_name), (assignee_name, None), (None, project_name), (None, None)):
+                slot = keys.setdefault(key, {'keys': [], 'payloads': []})
+                slot['keys'].append(sort_key)
+                slot['payloads'].append(payload)
+            entries[identity] = (sort_key, assignee_name)
+            by_gid.setdefault(task_gid_from_url(identity[0]), set()).add(identity)
+
+        with self._lock:
+            self._keys, self._entries, self._by_gid = keys, entries, by_gid
+            self._generated_at = datetime.datetime.utcnow().isoformat()
+
+    @property
+    def loaded(self):
+        """Whether a full run has filled the index since the process started."""
+        return self._generated_at is not None
+
+    def update_task(self, task_gid, items):
+        """Replace the entries of one task with ``(item_type, item)`` pairs."""
+        with self._lock:
+            for identity in list(self._by_gid.get(task_gid, ())):
+                self._remove(identity)
+            for item_type, item in items:
+                self._add(item_type, item)
+
+    def remove_task(self, task_gid):
+        """Drop every entry of a task, e.g. once it is completed or deleted."""
+        self.update_task(task_gid, [])
+
+    def query(self, assignee=None, project=None, min_days=None, cursor=None, limit=100, today=None):
+        """Return one page of matching items as a JSON string.
+
+        The cursor is the sort key of the last item returned, so following
+        it stays correct while webhooks add or remove items. Raises
+        ``ValueError`` when the cursor is malformed.
+        """
+        today = (today or datetime.date.today()).toordinal()
+        with self._lock:
+            slot = self._keys.get((assignee or None, project or None))
+            keys = slot['keys'] if slot else []
+
+            # Items at least ``days`` overdue are due on or before today - days
+            def count_overdue(days):
+                return bisect.bisect_left(keys, (today - days + 1,))
+
+            end = len(keys)
+            if min_days is not None:
+                end = count_overdue(min_days)
+
+            # Bucket counts for the whole key, from the bucket lower bounds;
+            # the first bucket also takes anything less overdue
+            buckets = {}
+            counted = 0
+            for name, lower in reversed(OVERDUE_BUCKETS):
+                total = count_overdue(lower) if lower != OVERDUE_BUCKETS[0][1] else len(keys)
+                if total > counted:
+                    buckets[name] = total - counted
+                counted = total
+
+            start = 0
+            if cursor:
+                try:
+                    after = tuple(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+                    start = bisect.bisect_right(keys, after)
+                except (ValueError, TypeError):
+                    raise ValueError('Invalid cursor')
+
+            stop = min(start + limit, end)
+            page = []
+            for position in range(start, stop):
+                days_overdue = today - keys[position][0]
+                page.append(
+                    f'{slot["payloads"][position]},"days_overdue":{days_overdue},'
+                    f'"bucket":"{overdue_bucket(days_overdue)}"}}'
+                )
+            meta = {
+                'generated_at': self._generated_at,
+                'total': end,
+                'buckets': buckets,
+                'next_cursor': (
+                    base64.urlsafe_b64encode(json.dumps(keys[stop - 1]).encode()).decode()
+                    if start < stop < end else None
+                ),
+            }
+        return '{"items":[' + ','.join(page) + '],' + json.dumps(meta)[1:]
+
+
+# Latest run's overdue items, kept current by webhooks and served by /api/overdue
+overdue_index = OverdueIndex()
+
+# Projects covered by the last run, mapped GID -> name, for webhook updates
+watched_projects = {}
+
+
+def write_mime_message(out, html_chunks, subject, linesep='\n'):
+    """Write an HTML email to ``out``, base64-encoding the body as it streams.
+
+    Only one chunk of the body is held in memory at a time, so very large
+    reports can be assembled in a spooled temporary file. Pass
+    ``linesep='\r\n'`` for messages sent straight over SMTP.
+    """
+    message = MIMEText('', 'html', 'utf-8')
+    message['to'] = ', '.join(to_emails)
+    message['from'] = from_email
+    message['subject'] = subject
+    out.write(message.as_bytes(policy=message.policy.clone(linesep=linesep)))
+
+    # base64 lines hold 57 input bytes; carry any remainder to the next chunk
+    newline = linesep.encode()
+    pending = b''
+    for chunk in html_chunks:
+        pending += chunk.encode('utf-8')
+        cut = len(pending) - len(pending) % 57
+        if cut:
+            out.write(base64.encodebytes(pending[:cut]).replace(b'\n', newline))
+            pending = pending[cut:]
+    out.write(base64.encodebytes(pending).replace(b'\n', newline))
+
+
+def estimate_item_size(item):
+    """Rough size in bytes of one report row in the email HTML."""
+    task_name, _, assignee_name, task_url, _ = item
+    return EMAIL_ROW_BYTES + sum(len(str(value).encode('utf-8')) for value in (task_name, assignee_name, task_url))
 
-        message_text += tasks_table
 
-    if message_text == '<div style="font-family:Arial, sans-serif; color:#000000; background-color:#ffffff;">':
-        message_text += '<p>No overdue tasks or milestones found.</p>'
+def split_report(tasks, milestones, max_bytes):
+    """Split the report into parts whose encoded email fits in ``max_bytes``.
 
-    message_text += '<hr/><p><a href="http://localhost:8080/run">View online</a></p>'
-    message_text += '<p style="font-size:12px;color:#666;">Automated Asana report</p>'
-    message_text += '</div>'
+    Whole projects are kept together where possible; a project that is too
+    big on its own is split across several parts.
+    """
+    # base64 grows the body by a third; keep room for headers and summary
+    budget = max_bytes * 3 // 4 - 64 * 1024
 
-    return message_text
+    projects = {}
+    for is_milestone, items in ((False, tasks), (True, milestones)):
+        for item in items:
+            projects.setdefault(item[4], []).append((is_milestone, item))
 
+    parts = []
+    current, current_size = [], 0
+    for project_name in sorted(projects):
+        project_size = EMAIL_PROJECT_BYTES + 3 * len(project_name.encode('utf-8'))
+        total = project_size + sum(estimate_item_size(item) for _, item in projects[project_name])
+        if current and current_size + total > budget >= total:
+            # Start a new part rather than splitting a project that fits in one
+            parts.append(current)
+            current, current_size = [], 0
+        for is_milestone, item in projects[project_name]:
+            size = estimate_item_size(item)
+            new_project = not current or current[-1][1][4] != project_name
+            if current and current_size + size + (project_size if new_project else 0) > budget:
+                parts.append(current)
+                current, current_size = [], 0
+                new_project = True
+            current.append((is_milestone, item))
+            current_size += size + (project_size if new_project else 0)
+    if current or not parts:
+        parts.append(current)
 
-def send_email(tasks, milestones):
+    return [
+        ([item for is_milestone, item in part if not is_milestone],
+         [item for is_milestone, item in part if is_milestone])
+        for part in parts
+    ]
+
+
+def send_email(tasks, milestones, unfetched=None, part=None):
     # Create the credentials object from environment variables
     credentials = Credentials.from_authorized_user_info({
         'client_id': os.environ['WEB_CLIENT_ID'],
@@ -208,102 +556,601 @@ def send_email(tasks, milestones):
             credentials.refresh(Request())
     except google.auth.exceptions.RefreshError:
         logging.error('Token has been expired or revoked. Please re-authenticate.')
-        return
+        raise
     # Use the updated access token for API requests
     service = build('gmail', 'v1', credentials=credentials)
 
-    message_text = build_email_html(tasks, milestones)
+    # Upload the raw message instead of building an in-memory base64 copy
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+        write_mime_message(spool, iter_email_html(tasks, milestones, unfetched), report_subject(unfetched, part))
+        spool.seek(0)
+        media = MediaIoBaseUpload(spool, mimetype='message/rfc822', chunksize=1024 * 1024, resumable=True)
+        service.users().messages().send(userId='me', body={}, media_body=media).execute()
 
-    message = MIMEText(message_text, 'html')  # Set the second parameter to 'html'
-    message['to'] = ', '.join(to_emails)
-    message['from'] = from_email
-    message['subject'] = 'Overdue Asana Tasks and Milestones'
-    raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
 
+def send_smtp(tasks, milestones, unfetched=None, part=None):
+    """Deliver the report through a plain SMTP server."""
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+        write_mime_message(
+            spool, iter_email_html(tasks, milestones, unfetched), report_subject(unfetched, part), linesep='\r\n'
+        )
+        spool.seek(0)
+
+        with smtplib.SMTP(os.environ['SMTP_HOST'], int(os.environ.get('SMTP_PORT', '587')), timeout=30) as server:
+            server.starttls()
+            if os.environ.get('SMTP_USERNAME'):
+                server.login(os.environ['SMTP_USERNAME'], os.environ.get('SMTP_PASSWORD', ''))
+            # smtplib needs the message in memory; parts are capped at SMTP_MAX_MESSAGE_BYTES
+            server.sendmail(from_email, to_emails, spool.read())
+
+
+def send_webhook(tasks, milestones, unfetched=None, part=None):
+    """POST the report items as JSON to the configured webhook URL."""
+    payload = {
+        'tasks': [dict(zip(REPORT_FIELDS, item)) for item in tasks],
+        'milestones': [dict(zip(REPORT_FIELDS, item)) for item in milestones],
+        'partial': bool(unfetched),
+        'unfetched_projects': unfetched or [],
+    }
+    response = requests.post(
+        os.environ['DELIVERY_WEBHOOK_URL'],
+        data=json.dumps(payload, default=lambda value: value.isoformat()),
+        headers={'Content-Type': 'application/json'},
+        timeout=30,
+    )
+    response.raise_for_status()
+
+
+def write_report_file(tasks, milestones, unfetched=None, part=None):
+    """Write the report HTML to a local directory, mainly for testing."""
+    directory = os.environ.get('DELIVERY_FILE_DIR', 'reports')
+    os.makedirs(directory, exist_ok=True)
+    name = datetime.datetime.utcnow().strftime('report-%Y%m%dT%H%M%S%f')
+    if part is not None:
+        name += '-part{}of{}'.format(*part)
+    with open(os.path.join(directory, name + '.html'), 'w') as fh:
+        for chunk in iter_email_html(tasks, milestones, unfetched):
+            fh.write(chunk)
+
+
+# Available delivery sinks; each raises on failure so the job is retried
+DELIVERY_SINKS = {
+    'gmail': send_email,
+    'smtp': send_smtp,
+    'webhook': send_webhook,
+    'file': write_report_file,
+}
+
+# Largest message a sink accepts; bigger reports are queued as several parts
+SINK_MAX_MESSAGE_BYTES = {
+    'gmail': GMAIL_MAX_MESSAGE_BYTES,
+    'smtp': SMTP_MAX_MESSAGE_BYTES,
+    # Report files are split like the Gmail messages they stand in for
+    'file': GMAIL_MAX_MESSAGE_BYTES,
+}
+
+
+def deserialize_items(items):
+    """Convert JSON report items back into tuples with date objects."""
+    return [
+        (name, datetime.date.fromisoformat(due), assignee, url, project)
+        for name, due, assignee, url, project in items
+    ]
+
+
+def write_job(path, job):
+    """Atomically write a delivery job to the queue directory."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(job, fh, default=lambda value: value.isoformat())
+    os.replace(tmp_path, path)
+
+
+def job_name(next_attempt, sink, part_number, job_id):
+    """Return a job file name; it starts with the next attempt time in ms.
+
+    Keeping the time in the name lets the worker find due jobs without
+    reading the report items of jobs still waiting for their backoff.
+    """
+    return f"{int(next_attempt * 1000)}-{sink}-{part_number:03d}-{job_id}.json"
+
+
+def enqueue_report(tasks, milestones, unfetched=None):
+    """Queue the report for every configured sink and wake the worker.
+
+    A report too big for a sink's message limit is queued as one job per
+    part, so a failed part is retried without resending the others.
+    """
+    os.makedirs(delivery_queue_dir, exist_ok=True)
+    for sink in delivery_sinks:
+        if sink not in DELIVERY_SINKS:
+            logging.error('Unknown delivery sink: %s', sink)
+            continue
+        if sink in SINK_MAX_MESSAGE_BYTES:
+            parts = split_report(tasks, milestones, SINK_MAX_MESSAGE_BYTES[sink])
+        else:
+            parts = [(tasks, milestones)]
+        for number, (part_tasks, part_milestones) in enumerate(parts, 1):
+            job = {
+                'sink': sink,
+                'attempts': 0,
+                'tasks': part_tasks,
+                'milestones': part_milestones,
+                'unfetched': unfetched or [],
+                'part': [number, len(parts)] if len(parts) > 1 else None,
+            }
+            name = job_name(time.time(), sink, number, uuid.uuid4().hex[:8])
+            write_job(os.path.join(delivery_queue_dir, name), job)
+        logging.info('Queued report for %s delivery in %d part(s)', sink, len(parts))
+    delivery_wakeup.set()
+
+
+def deliver_job(path):
+    """Run a single queued job, rescheduling it with backoff on failure."""
+    with open(path) as fh:
+        job = json.load(fh)
+    try:
+        DELIVERY_SINKS[job['sink']](
+            deserialize_items(job['tasks']),
+            deserialize_items(job['milestones']),
+            job.get('unfetched'),
+            job.get('part'),
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        job['attempts'] += 1
+        if job['attempts'] >= delivery_max_attempts:
+            logging.error('Giving up on %s delivery after %d attempts: %s', job['sink'], job['attempts'], exc)
+            failed_dir = os.path.join(delivery_queue_dir, 'failed')
+            os.makedirs(failed_dir, exist_ok=True)
+            os.replace(path, os.path.join(failed_dir, os.path.basename(path)))
+            return
+        delay = min(delivery_backoff * 2 ** (job['attempts'] - 1), 3600)
+        logging.warning('%s delivery failed (attempt %d), retrying in %ds: %s', job['sink'], job['attempts'], delay, exc)
+        write_job(path, job)
+        # Rename last, so a crash in between only brings the retry forward
+        retry_name = f"{int((time.time() + delay) * 1000)}-{os.path.basename(path).split('-', 1)[1]}"
+        os.replace(path, os.path.join(delivery_queue_dir, retry_name))
+        return
+    os.remove(path)
+    logging.info('Delivered report via %s', job['sink'])
+
+
+def deliver_pending():
+    """Deliver all due jobs concurrently and return how many were attempted."""
+    if not os.path.isdir(delivery_queue_dir):
+        return 0
+    now = time.time()
+    due = []
+    for name in sorted(os.listdir(delivery_queue_dir)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            next_attempt = int(name.split('-', 1)[0]) / 1000
+        except ValueError:
+            logging.error('Skipping delivery job with an unexpected name: %s', name)
+            continue
+        if next_attempt <= now:
+            due.append(os.path.join(delivery_queue_dir, name))
+    if due:
+        with ThreadPoolExecutor(max_workers=min(len(due), delivery_concurrency)) as executor:
+            list(executor.map(deliver_job, due))
+    return len(due)
+
+
+def delivery_worker(poll_interval=30):
+    """Background loop draining the delivery queue."""
+    while True:
+        try:
+            deliver_pending()
+        except Exception:  # pylint: disable=broad-except
+            logging.exception('Error in delivery worker')
+        delivery_wakeup.wait(poll_interval)
+        delivery_wakeup.clear()
+
+
+class LatencyTracker:
+    """Keep recent request latencies to decide when a request is slow."""
+
+    def __init__(self, size=200):
+        self._lock = threading.Lock()
+        self._samples = collections.deque(maxlen=size)
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Return the latency at ``fraction``, or ``None`` without enough samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < hedge_min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+# Latencies of Asana page requests and the threads used to hedge them
+page_latency = LatencyTracker()
+asana_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='asana')
+
+
+def asana_get(url, params=None, deadline=None):
+    """GET an Asana API URL with connect/read timeouts capped by ``deadline``."""
+    read_timeout = asana_read_timeout
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('Run deadline exceeded')
+        read_timeout = min(read_timeout, remaining)
+    return requests.get(
+        url,
+        headers={'Authorization': 'Bearer ' + asana_access_token},
+        params=params,
+        timeout=(asana_connect_timeout, read_timeout),
+    )
+
+
+def fetch_page(url, params, deadline=None):
+    """Fetch one page of results, hedging requests slower than usual.
+
+    When a request takes longer than the ``hedge_percentile`` latency of
+    recent pages, an identical request is sent and whichever answers first
+    is used.
+    """
+    def timed_get():
+        start = time.monotonic()
+        response = asana_get(url, params, deadline)
+        page_latency.record(time.monotonic() - start)
+        return response
+
+    hedge_after = page_latency.percentile(hedge_percentile)
+    primary = asana_executor.submit(timed_get)
+    if hedge_after is None:
+        return primary.result()
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+
+    logging.info('Hedging slow request to %s after %.2fs', url, hedge_after)
+    pending = {primary, asana_executor.submit(timed_get)}
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        if not pending:
+            # Both requests failed; raise the error of one of them
+            return next(iter(done)).result()
+
+
+def fetch_projects(deadline=None):
+    """Return the un-archived projects of the configured teams.
+
+    Returns ``(projects, failures)``. ``failures`` names what could not be
+    listed because of errors or timeouts, so the run can send a partial
+    report instead of failing.
+    """
+    # Get workspace ID
+    logging.info('Fetching workspace ID')
+    try:
+        response = asana_get(f'{asana_api_url}/workspaces', deadline=deadline)
+    except (requests.RequestException, TimeoutError) as exc:
+        logging.error('Error fetching workspaces: %s', exc)
+        return [], ['All projects (workspace could not be fetched)']
+
+    if response.status_code == 200:
+        workspace_id = response.json()['data'][0]['gid']
+        logging.info('Workspace ID: %s', workspace_id)
+    else:
+        logging.error('Failed to fetch workspaces: %s %s', response.status_code, response.text)
+        return [], ['All projects (workspace could not be fetched)']
+
+    # Fetch teams
+    logging.info('Fetching teams')
+    try:
+        response = asana_get(f'{asana_api_url}/workspaces/{workspace_id}/teams', deadline=deadline)
+    except (requests.RequestException, TimeoutError) as exc:
+        logging.error('Error fetching teams: %s', exc)
+        return [], ['All projects (teams could not be fetched)']
+
+    if response.status_code == 200:
+        teams = response.json()['data']
+        desired_teams = ["Website Builds", "Web Optimization Builds"]
+        team_ids = [team['gid'] for team in teams if team['name'] in desired_teams]
+        team_names = {team['gid']: team['name'] for team in teams}
+        logging.info('Teams fetched successfully')
+        logging.info('Teams ID: %s', team_ids)
+
+    else:
+        logging.error('Failed to fetch teams: %s %s', response.status_code, response.text)
+        return [], ['All projects (teams could not be fetched)']
+
+    # Get un-archived projects for the specified teams
+    projects = []
+    failures = []
+    for team_id in team_ids:
+        offset = None
+        while True:
+            params = {
+                'limit': 100,
+                'team': team_id,
+                'archived': False
+            }
+            if offset is not None:
+                params['offset'] = offset
+            try:
+                response = fetch_page(f'{asana_api_url}/teams/{team_id}/projects', params, deadline)
+            except (requests.RequestException, TimeoutError) as exc:
+                logging.error('Error fetching projects for team %s: %s', team_id, exc)
+                failures.append(f'Projects of team {team_names[team_id]}')
+                break
+
+            if response.status_code == 200:
+                data = response.json()['data']
+                projects.extend(data)
+                next_page = response.json().get('next_page')
+                if next_page is not None:
+                    offset = next_page.get('offset')
+                else:
+                    break
+            else:
+                logging.error('Failed to fetch projects: %s %s', response.status_code, response.text)
+                failures.append(f'Projects of team {team_names[team_id]}')
+                break
+
+    return projects, failures
+
+
+def overdue_cutoff():
+    """Return the end of last week; items due after it are not overdue."""
+    # Considering the MST timezone which is UTC-7
+    today = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=7)).date()
+    start_of_week = today - datetime.timedelta(days=today.weekday())
+    return start_of_week - datetime.timedelta(days=1)
+
+
+def classify_task(task, project_name, last_week_end):
+    """Return ``(item_type, item)`` for an overdue task, or ``(None, None)``.
+
+    A task is overdue when it is assigned, incomplete and due on or before
+    ``last_week_end``.
+    """
+    task_name = task.get('name')
+    task_due_date = task.get('due_on')
+    assignee = task.get('assignee')
+    assignee_name = assignee.get('name') if assignee is not None else None
+    task_url = task.get('permalink_url')
+    completed = task.get('completed')
+    completed_at = task.get('completed_at')
+
+    if task_due_date is None or assignee_name is None or completed:
+        logging.debug("Skipping task: %s - Due Date: %s - Assignee: %s - Completed: %s - Completed At: %s", task_name, task_due_date, assignee_name, completed, completed_at)
+        return None, None  # Skip tasks without a due date, assignee, or completed tasks
+
+    # Check if the task's due date is after the end of last week
+    task_due_date_dt = datetime.datetime.fromisoformat(task_due_date)
+    if task_due_date_dt.date() > last_week_end:
+        logging.debug("Skipping task: %s - Due Date: %s - Assignee: %s - Completed: %s - Completed At: %s", task_name, task_due_date, assignee_name, completed, completed_at)
+        return None, None
+
+    item = (task_name, task_due_date_dt.date(), assignee_name, task_url, project_name)
+    if task.get('resource_subtype') == 'milestone':
+        logging.debug("Added milestone: %s - Due Date: %s - Assignee: %s - Completed: %s - Completed At: %s", task_name, task_due_date, assignee_name, completed, completed_at)
+        return 'Milestone', item
+    logging.debug("Added task: %s - Due Date: %s - Assignee: %s - Completed: %s - Completed At: %s", task_name, task_due_date, assignee_name, completed, completed_at)
+    return 'Task', item
+
+
+def save_watched_projects():
+    """Write the watched project map so it survives a restart."""
+    tmp_path = watched_projects_file + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(watched_projects, fh)
+    os.replace(tmp_path, watched_projects_file)
+
+
+def load_watched_projects():
+    """Restore the watched project map saved by the last run."""
+    try:
+        with open(watched_projects_file) as fh:
+            watched_projects.update(json.load(fh))
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as exc:
+        logging.warning('Ignoring unreadable %s: %s', watched_projects_file, exc)
+        return
+    logging.info('Watching %d projects for webhook events', len(watched_projects))
+
+
+def load_webhook_secrets():
+    """Return the stored webhook secrets, keyed by project GID."""
+    try:
+        with open(webhook_secrets_file) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def store_webhook_secret(project_gid, secret):
+    """Remember the secret sent during a project's webhook handshake."""
+    with webhook_secrets_lock:
+        secrets = load_webhook_secrets()
+        secrets[project_gid] = secret
+        tmp_path = webhook_secrets_file + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(secrets, fh)
+        os.replace(tmp_path, webhook_secrets_file)
 
 
-    service.users().messages().send(userId='me', body={'raw': raw_message}).execute()
+def verify_webhook_signature(project_gid, body, signature):
+    """Check an ``X-Hook-Signature`` header against the project's secret."""
+    secret = load_webhook_secrets().get(project_gid)
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    # Headers arrive as latin-1 text; compare bytes so any input is safe
+    return hmac.compare_digest(expected.encode(), signature.encode('latin-1'))
 
 
+def process_webhook_events(events):
+    """Apply Asana task events to the live overdue index."""
+    if not overdue_index.loaded:
+        # Patching an empty index would serve only the tasks webhooks touched;
+        # the next full run picks these changes up instead
+        logging.info('Ignoring %d webhook events until the overdue index is loaded', len(events))
+        return
+    last_week_end = overdue_cutoff()
+    task_gids = []
+    for event in events:
+        resource = event.get('resource') or {}
+        if resource.get('resource_type') != 'task':
+            continue
+        if event.get('action') == 'deleted':
+            overdue_index.remove_task(resource['gid'])
+        elif resource['gid'] not in task_gids:
+            task_gids.append(resource['gid'])
+
+    # Events only name the task, so fetch its current state once per task
+    for task_gid in task_gids:
+        try:
+            response = asana_get(
+                f'{asana_api_url}/tasks/{task_gid}',
+                params={'opt_fields': 'name,due_on,assignee,assignee.name,completed,permalink_url,resource_subtype,memberships.project'},
+            )
+        except requests.RequestException as exc:
+            logging.error('Error fetching task %s: %s', task_gid, exc)
+            continue
+        if response.status_code == 404:
+            overdue_index.remove_task(task_gid)
+            continue
+        if response.status_code != 200:
+            logging.error('Failed to fetch task %s: %s %s', task_gid, response.status_code, response.text)
+            continue
+
+        task = response.json()['data']
+        items = []
+        for membership in task.get('memberships', []):
+            project_gid = (membership.get('project') or {}).get('gid')
+            if project_gid not in watched_projects:
+                continue
+            item_type, item = classify_task(task, watched_projects[project_gid], last_week_end)
+            if item is not None:
+                items.append((item_type, item))
+        overdue_index.update_task(task_gid, items)
+        logging.info('Updated overdue index for task %s from webhook', task_gid)
+
+
+def save_checkpoint(state, tasks=(), milestones=()):
+    """Record a page of items and the run state in the checkpoint.
+
+    Items are appended to a journal next to the checkpoint file, so each
+    page is written once. The small state file records how much of the
+    journal is valid, so a crash between the two writes never duplicates a
+    page on resume.
+    """
+    if tasks or milestones:
+        with open(checkpoint_file + '.items', 'a') as fh:
+            fh.write(json.dumps({'tasks': tasks, 'milestones': milestones}, default=lambda value: value.isoformat()) + '\n')
+            state['journal_size'] = fh.tell()
+    state['updated_at'] = datetime.datetime.utcnow().isoformat()
+    tmp_path = checkpoint_file + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(state, fh)
+    os.replace(tmp_path, checkpoint_file)
+
+
+def read_checkpoint_state(last_week_end):
+    """Return the run state of a recent checkpoint for this week, or ``None``."""
+    try:
+        with open(checkpoint_file) as fh:
+            state = json.load(fh)
+        age = datetime.datetime.utcnow() - datetime.datetime.fromisoformat(state['updated_at'])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as exc:
+        logging.warning('Ignoring unreadable checkpoint %s: %s', checkpoint_file, exc)
+        return None
+
+    if state.get('last_week_end') != last_week_end.isoformat():
+        logging.info('Ignoring checkpoint from a previous week')
+        return None
+    if age > datetime.timedelta(hours=checkpoint_max_age):
+        logging.info('Ignoring stale checkpoint from %s', state['updated_at'])
+        return None
+    return state
 
-def run_script():
+
+def load_checkpoint(last_week_end):
+    """Return ``(state, tasks, milestones)`` from a recent checkpoint.
+
+    ``state`` is ``None`` when there is no usable checkpoint for this week.
+    """
+    state = read_checkpoint_state(last_week_end)
+    if state is None:
+        return None, [], []
+    try:
+        with open(checkpoint_file + '.items', 'a+b') as fh:
+            fh.seek(0)
+            journal = fh.read(state['journal_size'])
+            # Drop a page written after the last state update
+            fh.truncate(state['journal_size'])
+        if len(journal) != state['journal_size']:
+            raise ValueError('item journal is shorter than recorded')
+    except (OSError, ValueError, KeyError) as exc:
+        logging.warning('Ignoring unreadable checkpoint %s: %s', checkpoint_file, exc)
+        return None, [], []
+
+    tasks, milestones = [], []
+    for line in journal.splitlines():
+        page = json.loads(line)
+        tasks.extend(deserialize_items(page['tasks']))
+        milestones.extend(deserialize_items(page['milestones']))
+    return state, tasks, milestones
+
+
+def clear_checkpoint():
+    """Remove the checkpoint files once a run has finished."""
+    for path in (checkpoint_file, checkpoint_file + '.items'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def run_script(resume=False):
+    if not run_lock.acquire(blocking=False):
+        logging.warning('A run is already in progress; not starting another')
+        return False
     script_progress['running'] = True
     script_progress['complete'] = False
     script_progress['processed_projects'] = 0
     script_progress['error'] = None
+    script_progress['partial'] = False
+    script_progress['unfetched_projects'] = []
     try:
-        # Get workspace ID
-        logging.info('Fetching workspace ID')
-        response = requests.get(
-            'https://app.asana.com/api/1.0/workspaces',
-            headers={'Authorization': 'Bearer ' + asana_access_token},
-        )
-    
-        if response.status_code == 200:
-            workspace_id = response.json()['data'][0]['gid']
-            logging.info('Workspace ID: %s', workspace_id)
-        else:
-            logging.error('Failed to fetch workspaces: %s %s', response.status_code, response.text)
-            workspace_id = None
-    
-        # Fetch teams
-        logging.info('Fetching teams')
-        response = requests.get(
-            f'https://app.asana.com/api/1.0/workspaces/{workspace_id}/teams',
-            headers={'Authorization': 'Bearer ' + asana_access_token},
-        )
-    
-        if response.status_code == 200:
-            teams = response.json()['data']
-            desired_teams = ["Website Builds", "Web Optimization Builds"]
-            team_ids = [team['gid'] for team in teams if team['name'] in desired_teams]
-            logging.info('Teams fetched successfully')
-            logging.info('Teams ID: %s', team_ids)
-    
+        last_week_end = overdue_cutoff()
+
+        deadline = time.monotonic() + run_deadline
+        state, tasks, milestones = load_checkpoint(last_week_end) if resume else (None, [], [])
+        if state is not None:
+            logging.info('Resuming from checkpoint with %d completed projects', len(state['completed']))
+            if state['discovery_failures']:
+                # Try again to list the projects the interrupted run missed
+                found, state['discovery_failures'] = fetch_projects(deadline)
+                known = {project['gid'] for project in state['projects']}
+                state['projects'].extend(project for project in found if project['gid'] not in known)
         else:
-            logging.error('Failed to fetch teams: %s %s', response.status_code, response.text)
-            team_ids = []
-    
-        # Get un-archived projects for the specified teams
-        projects = []
-        for team_id in team_ids:
-            offset = None
-            while True:
-                params = {
-                    'limit': 100,
-                    'team': team_id,
-                    'archived': False
-                }
-                if offset is not None:
-                    params['offset'] = offset
-                response = requests.get(
-                    f'https://app.asana.com/api/1.0/teams/{team_id}/projects',
-                    headers={'Authorization': 'Bearer ' + asana_access_token},
-                    params=params
-                )
-    
-                if response.status_code == 200:
-                    data = response.json()['data']
-                    projects.extend(data)
-                    next_page = response.json().get('next_page')
-                    if next_page is not None:
-                        offset = next_page.get('offset')
-                    else:
-                        break
-                else:
-                    logging.error('Failed to fetch projects: %s %s', response.status_code, response.text)
-                    break
-    
-    
-    
-        tasks = []
-        milestones = []
-    
-        # Calculate the end of last week
-        # Considering the MST timezone which is UTC-7
-        today = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=7)).date()
-        start_of_week = today - datetime.timedelta(days=today.weekday())
-        last_week_end = start_of_week - datetime.timedelta(days=1)
+            clear_checkpoint()
+            found, discovery_failures = fetch_projects(deadline)
+            state = {
+                'last_week_end': last_week_end.isoformat(),
+                'projects': found,
+                'discovery_failures': discovery_failures,
+                'completed': [],
+                'offsets': {},
+                'journal_size': 0,
+            }
+            save_checkpoint(state)
+        projects = state['projects']
     
         # For each project, get all incomplete tasks that are due before now
         total_projects = len(projects)
@@ -311,12 +1158,31 @@ def run_script():
     
         max_projects = args.max_projects if args.max_projects is not None else total_projects
         script_progress['total_projects'] = max_projects
+
+        # Projects whose webhook events update the live overdue index
+        watched_projects.clear()
+        watched_projects.update(
+            (project['gid'], project['name']) for project in projects[:max_projects]
+            if project['gid'] not in excluded_projects
+        )
+        save_watched_projects()
     
+        # Projects left out of the report because of errors or the deadline
+        unfetched = list(state['discovery_failures'])
+
         for project in projects[:max_projects]:
             if project['gid'] in excluded_projects:
                 logging.info(f'Skipping excluded project with ID {project["gid"]}')
                 continue
-            offset = None
+            if project['gid'] in state['completed']:
+                projects_processed += 1
+                script_progress['processed_projects'] = projects_processed
+                continue
+            if time.monotonic() >= deadline:
+                unfetched.append(project['name'])
+                continue
+            # Continue from the last saved page of a partially fetched project
+            offset = state['offsets'].get(project['gid'])
             while True:
                 params = {
                     'completed_since': 'now',  # Fetch only tasks that are not completed
@@ -328,49 +1194,40 @@ def run_script():
                 
                 if offset is not None:
                     params['offset'] = offset
-                response = requests.get(
-                    'https://app.asana.com/api/1.0/tasks',
-                    headers={'Authorization': 'Bearer ' + asana_access_token},
-                    params=params
-                )
+                try:
+                    response = fetch_page(f'{asana_api_url}/tasks', params, deadline)
+                except (requests.RequestException, TimeoutError) as exc:
+                    logging.error('Error fetching tasks for project %s: %s', project['gid'], exc)
+                    unfetched.append(project['name'])
+                    break
     
                 if response.status_code == 200:
                     project_tasks = response.json()['data']
                     logging.debug("Project details: %s", project_tasks)
+                    page_tasks = []
+                    page_milestones = []
                     for task in project_tasks:
-                        task_name = task.get('name')
-                        task_due_date = task.get('due_on')
-                        assignee = task.get('assignee')
-                        assignee_name = assignee.get('name') if assignee is not None else None
-                        task_url = task.get('permalink_url')
-                        completed = task.get('completed')
-                        completed_at = task.get('completed_at')
-                        project_name = project['name']  
-    
-                        if task_due_date is None or assignee_name is None or completed:
-                            logging.debug("Skipping task: %s - Due Date: %s - Assignee: %s - Completed: %s - Completed At: %s", task_name, task_due_date, assignee_name, completed, completed_at)
-                            continue  # Skip tasks without a due date, assignee, or completed tasks
-    
-                        # Check if the task's due date is after the end of last week
-                        task_due_date_dt = datetime.datetime.fromisoformat(task_due_date)
-                        if task_due_date_dt.date() > last_week_end:
-                            logging.debug("Skipping task: %s - Due Date: %s - Assignee: %s - Completed: %s - Completed At: %s", task_name, task_due_date, assignee_name, completed, completed_at)
-                            continue
-    
-                        if task.get('resource_subtype') == 'milestone':
-                            milestones.append((task_name, task_due_date_dt.date(), assignee_name, task_url, project_name)) 
-                            logging.debug("Added milestone: %s - Due Date: %s - Assignee: %s - Completed: %s - Completed At: %s", task_name, task_due_date, assignee_name, completed, completed_at)
-                        else:
-                            tasks.append((task_name, task_due_date_dt.date(), assignee_name, task_url, project_name))
-                            logging.debug("Added task: %s - Due Date: %s - Assignee: %s - Completed: %s - Completed At: %s", task_name, task_due_date, assignee_name, completed, completed_at)
+                        item_type, item = classify_task(task, project['name'], last_week_end)
+                        if item_type == 'Milestone':
+                            page_milestones.append(item)
+                        elif item_type == 'Task':
+                            page_tasks.append(item)
+                    tasks.extend(page_tasks)
+                    milestones.extend(page_milestones)
     
                     next_page = response.json().get('next_page')
                     if next_page is not None:
                         offset = next_page.get('offset')
+                        state['offsets'][project['gid']] = offset
+                        save_checkpoint(state, page_tasks, page_milestones)
                     else:
+                        state['offsets'].pop(project['gid'], None)
+                        state['completed'].append(project['gid'])
+                        save_checkpoint(state, page_tasks, page_milestones)
                         break
                 else:
                     logging.error('Failed to fetch tasks for project %s: %s %s', project['gid'], response.status_code, response.text)
+                    unfetched.append(project['name'])
                     break
     
             projects_processed += 1
@@ -380,9 +1237,23 @@ def run_script():
             logging.info('---')
     
     
-        # Send an email with the overdue tasks and milestones
-        logging.info('Sending email')
-        send_email(tasks, milestones)
+        overdue_index.load(tasks, milestones)
+
+        if unfetched:
+            # Keep the checkpoint so a --resume run can fill in the gaps
+            logging.warning('Sending partial report; %d projects were not fetched', len(unfetched))
+            script_progress['partial'] = True
+            script_progress['unfetched_projects'] = unfetched
+
+        # Queue the overdue tasks and milestones for delivery
+        logging.info('Queueing report for delivery')
+        enqueue_report(tasks, milestones, unfetched)
+        if unfetched:
+            # Only a manual --resume repeats a run whose report went out
+            state['report_queued'] = True
+            save_checkpoint(state)
+        else:
+            clear_checkpoint()
 
         logging.info('Script completed')
 
@@ -394,6 +1265,8 @@ def run_script():
         script_progress["last_run"] = datetime.datetime.utcnow().isoformat()
 
         script_progress["complete"] = script_progress["error"] is None
+        run_lock.release()
+    return True
 def serve_http(port=8080, bind=""):
     class RequestHandler(BaseHTTPRequestHandler):
         def do_GET(self):
@@ -471,7 +1344,7 @@ def serve_http(port=8080, bind=""):
                     document.getElementById('details').textContent = data.processed_projects + ' / ' + data.total_projects + ' projects';
                     var status = 'Running...';
                     if (!data.running) {{
-                      status = data.complete ? 'Completed' : 'Idle';
+                      status = data.complete ? (data.partial ? 'Completed (partial report)' : 'Completed') : 'Idle';
                     }}
                     document.getElementById('status').textContent = status;
                     document.getElementById('last_run').textContent = data.last_run || 'Never';
@@ -502,6 +1375,28 @@ def serve_http(port=8080, bind=""):
                 </body></html>
                 """
                 self.wfile.write(html.encode())
+            elif urlsplit(self.path).path == '/api/overdue':
+                query = parse_qs(urlsplit(self.path).query)
+                try:
+                    min_days = query.get('min_days', [None])[0]
+                    limit = int(query.get('limit', ['100'])[0])
+                    body = overdue_index.query(
+                        assignee=query.get('assignee', [None])[0],
+                        project=query.get('project', [None])[0],
+                        min_days=int(min_days) if min_days else None,
+                        cursor=query.get('cursor', [None])[0],
+                        limit=max(1, min(limit, 500)),
+                    )
+                except ValueError as exc:
+                    self.send_response(400)
+                    self.send_header('Content-type', 'application/json')
+                    self.end_headers()
+                    self.wfile.write(json.dumps({'error': str(exc)}).encode())
+                    return
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.end_headers()
+                self.wfile.write(body.encode())
             elif self.path == '/status':
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
@@ -516,10 +1411,93 @@ def serve_http(port=8080, bind=""):
                 self.send_response(404)
                 self.end_headers()
 
+        def do_POST(self):
+            # Asana task events need one webhook, and one secret, per project
+            prefix, _, project_gid = urlsplit(self.path).path.rpartition('/')
+            if prefix != '/webhooks/asana' or not project_gid:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                self.send_response(400)
+                self.end_headers()
+                return
+            body = self.rfile.read(length)
+            hook_secret = self.headers.get('X-Hook-Secret')
+            if hook_secret:
+                # Handshake sent when the webhook is created; echo the secret back
+                if project_gid not in watched_projects:
+                    logging.warning('Rejected webhook handshake for unwatched project %s', project_gid)
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                if load_webhook_secrets().get(project_gid) not in (None, hook_secret):
+                    logging.warning('Rejected webhook handshake for project %s: a secret is already stored', project_gid)
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                store_webhook_secret(project_gid, hook_secret)
+                logging.info('Completed Asana webhook handshake for project %s', project_gid)
+                self.send_response(200)
+                self.send_header('X-Hook-Secret', hook_secret)
+                self.end_headers()
+                return
+
+            if not verify_webhook_signature(project_gid, body, self.headers.get('X-Hook-Signature')):
+                logging.warning('Rejected Asana webhook for project %s with an invalid signature', project_gid)
+                self.send_response(401)
+                self.end_headers()
+                return
+            try:
+                events = json.loads(body or b'{}').get('events', [])
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+
+            # Acknowledge quickly; Asana expects a response within seconds
+            self.send_response(200)
+            self.end_headers()
+            if events:
+                threading.Thread(target=process_webhook_events, args=(events,), daemon=True).start()
+
     httpd = ThreadingHTTPServer((bind, port), RequestHandler)
     logging.info(f"Starting HTTP server on {bind}:{port}")
     httpd.serve_forever()
 
+def scheduled_run(attempt=1):
+    """Run the report from the scheduler, retrying soon after a failed run.
+
+    Retries resume from the checkpoint, so pages fetched before the failure
+    are not requested again.
+    """
+    if not run_script(resume=True):
+        return
+    if script_progress['error'] is not None and attempt <= run_retry_limit:
+        logging.info('Retrying the failed run in %g minutes', run_retry_minutes)
+
+        def retry():
+            scheduled_run(attempt + 1)
+            return schedule.CancelJob
+
+        schedule.every(run_retry_minutes).minutes.do(retry)
+
+
+def resume_interrupted_run():
+    """Finish a run that a crash or restart stopped before its report was queued."""
+    state = read_checkpoint_state(overdue_cutoff())
+    if state is None or state.get('report_queued'):
+        return False
+    logging.info('Found an unfinished run; resuming from its checkpoint')
+    scheduled_run()
+    return True
+
+
 def main():
     """Entry point for running the scheduler and HTTP server."""
     global args
@@ -528,13 +1506,19 @@ def main():
     logging.info('---')
     logging.info('Running weekly script')
     logging.info('---')
-    schedule.every().monday.at("08:00").do(run_script)
+    schedule.every().monday.at("08:00").do(scheduled_run)
 
-    # If the --run-now argument is specified, run the script immediately
-    if args.run_now:
+    # Deliver queued reports, including any left over from a previous run
+    threading.Thread(target=delivery_worker, daemon=True).start()
+
+    # Accept webhook events for the projects of the last run straight away
+    load_watched_projects()
+
+    # If the --run-now or --resume argument is specified, run the script immediately
+    if args.run_now or args.resume:
         logging.info('---')
         logging.info('Running manually.')
-        run_script()
+        run_script(resume=args.resume)
         logging.info('---')
         logging.info('Finished running script manually. Waiting for run command or weekly run.')
 
@@ -542,6 +1526,11 @@ def main():
     http_thread = threading.Thread(target=serve_http)
     http_thread.start()
 
+    # Finish an interrupted run in the background, as /run does, so the
+    # status page and webhook receiver stay up while it fetches
+    if not (args.run_now or args.resume):
+        threading.Thread(target=resume_interrupted_run, daemon=True).start()
+
     while True:
         schedule.run_pending()
         time.sleep(1)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Post signed Asana-style webhook events to a local server for testing."""
+import argparse
+import hashlib
+import hmac
+import json
+
+import requests
+
+
+def handshake(url, secret):
+    """Send the handshake Asana performs when a webhook is created."""
+    response = requests.post(url, headers={'X-Hook-Secret': secret}, data=b'', timeout=10)
+    return response.status_code
+
+
+def post_events(url, secret, task_gids, action='changed'):
+    """Send one signed batch of task events and return the status code."""
+    body = json.dumps({
+        'events': [
+            {'action': action, 'resource': {'gid': gid, 'resource_type': 'task'}}
+            for gid in task_gids
+        ]
+    }).encode()
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    response = requests.post(
+        url,
+        data=body,
+        headers={'Content-Type': 'application/json', 'X-Hook-Signature': signature},
+        timeout=10,
+    )
+    return response.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('task_gids', nargs='*', help='Task GIDs to send events for')
+    parser.add_argument('--server', default='http://localhost:8080')
+    parser.add_argument('--project', required=True, help='GID of the watched project the webhook is for')
+    parser.add_argument('--secret', default='local-test-secret')
+    parser.add_argument('--action', default='changed', choices=['added', 'changed', 'removed', 'deleted'])
+    parser.add_argument('--handshake', action='store_true', help='Perform the handshake first')
+    args = parser.parse_args()
+    url = f'{args.server}/webhooks/asana/{args.project}'
+
+    if args.handshake:
+        print('Handshake:', handshake(url, args.secret))
+    if args.task_gids:
+        print('Events:', post_events(url, args.secret, args.task_gids, args.action))
+
+
+if __name__ == '__main__':
+    main()
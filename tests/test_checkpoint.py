@@ -0,0 +1,193 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import threading
+from unittest.mock import patch, Mock
+
+import pytest
+
+# Import the module from the script file
+spec = importlib.util.spec_from_file_location(
+    'asana_notification', os.path.join(os.path.dirname(__file__), '..', 'asana-notification.py')
+)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+DUE = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
+
+
+def json_response(payload):
+    resp = Mock()
+    resp.status_code = 200
+    resp.json.return_value = payload
+    return resp
+
+
+def task(name):
+    return {
+        'name': name,
+        'due_on': DUE,
+        'assignee': {'name': 'Alice'},
+        'permalink_url': f'http://example.com/{name}',
+        'resource_subtype': 'default_task',
+    }
+
+
+class FakeAsana:
+    """Serve two projects; project P2 has two pages of tasks."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = []
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        params = params or {}
+        self.calls.append((url, params.get('project'), params.get('offset')))
+        if url.endswith('/workspaces'):
+            return json_response({'data': [{'gid': 'w1'}]})
+        if url.endswith('/teams'):
+            return json_response({'data': [{'gid': 't1', 'name': 'Website Builds'}]})
+        if url.endswith('/projects'):
+            return json_response({'data': [{'gid': 'P1', 'name': 'Project 1'}, {'gid': 'P2', 'name': 'Project 2'}]})
+        key = (params['project'], params.get('offset'))
+        if key == self.fail_on:
+            raise RuntimeError('connection reset')
+        pages = {
+            ('P1', None): {'data': [task('a')], 'next_page': None},
+            ('P2', None): {'data': [task('b')], 'next_page': {'offset': 'o2'}},
+            ('P2', 'o2'): {'data': [task('c')], 'next_page': None},
+        }
+        return json_response(pages[key])
+
+
+def run(fake, resume, sent, run_script=module.run_script):
+    with patch('requests.get', side_effect=fake.get), \
+            patch.object(module, 'asana_access_token', 'token'), \
+            patch.object(module, 'enqueue_report', side_effect=lambda t, m, u: sent.append(t)):
+        return run_script(resume=resume)
+
+
+def test_resume_continues_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'watched_projects_file', str(tmp_path / 'watched.json'))
+    monkeypatch.setattr(module, 'checkpoint_file', str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setattr(module, 'args', argparse.Namespace(max_projects=None))
+    sent = []
+
+    run(FakeAsana(fail_on=('P2', 'o2')), resume=False, sent=sent)
+    assert module.script_progress['error'] == 'connection reset'
+    assert os.path.exists(module.checkpoint_file)
+
+    fake = FakeAsana()
+    run(fake, resume=True, sent=sent)
+    assert fake.calls == [('https://app.asana.com/api/1.0/tasks', 'P2', 'o2')]
+    assert sorted(t[0] for t in sent[0]) == ['a', 'b', 'c']
+    assert not os.path.exists(module.checkpoint_file)
+
+
+def test_stale_checkpoint_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'watched_projects_file', str(tmp_path / 'watched.json'))
+    monkeypatch.setattr(module, 'checkpoint_file', str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setattr(module, 'args', argparse.Namespace(max_projects=None))
+    sent = []
+
+    run(FakeAsana(fail_on=('P2', 'o2')), resume=False, sent=sent)
+    monkeypatch.setattr(module, 'checkpoint_max_age', 0)
+    fake = FakeAsana()
+    run(fake, resume=True, sent=sent)
+    assert fake.calls[0][0].endswith('/workspaces')
+    assert sorted(t[0] for t in sent[0]) == ['a', 'b', 'c']
+
+
+def test_checkpoint_journals_each_page_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'watched_projects_file', str(tmp_path / 'watched.json'))
+    monkeypatch.setattr(module, 'checkpoint_file', str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setattr(module, 'args', argparse.Namespace(max_projects=None))
+
+    run(FakeAsana(fail_on=('P2', 'o2')), resume=False, sent=[])
+    with open(module.checkpoint_file + '.items') as fh:
+        pages = [json.loads(line) for line in fh]
+    assert [[t[0] for t in page['tasks']] for page in pages] == [['a'], ['b']]
+
+    # A page appended after the last state update is dropped on resume
+    with open(module.checkpoint_file + '.items', 'a') as fh:
+        fh.write(json.dumps({'tasks': [['x', DUE, 'Alice', 'u', 'P2']], 'milestones': []}) + '\n')
+    _, tasks, _ = module.load_checkpoint(module.overdue_cutoff())
+    assert [t[0] for t in tasks] == ['a', 'b']
+
+
+def test_failed_scheduled_run_is_retried_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'watched_projects_file', str(tmp_path / 'watched.json'))
+    monkeypatch.setattr(module, 'checkpoint_file', str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setattr(module, 'args', argparse.Namespace(max_projects=None))
+    scheduler = module.schedule.Scheduler()
+    monkeypatch.setattr(module.schedule, 'every', scheduler.every)
+    sent = []
+
+    with patch.object(module, 'run_script', side_effect=lambda resume: run(FakeAsana(fail_on=('P2', 'o2')), resume, sent)):
+        module.scheduled_run()
+    assert len(scheduler.jobs) == 1
+
+    fake = FakeAsana()
+    with patch.object(module, 'run_script', side_effect=lambda resume: run(fake, resume, sent)):
+        scheduler.run_all()
+    assert fake.calls == [('https://app.asana.com/api/1.0/tasks', 'P2', 'o2')]
+    assert sorted(t[0] for t in sent[0]) == ['a', 'b', 'c']
+    assert scheduler.jobs == []
+
+
+def test_interrupted_run_resumes_on_startup(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'watched_projects_file', str(tmp_path / 'watched.json'))
+    monkeypatch.setattr(module, 'checkpoint_file', str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setattr(module, 'args', argparse.Namespace(max_projects=None))
+    monkeypatch.setattr(module, 'run_retry_limit', 0)
+    sent = []
+
+    assert module.resume_interrupted_run() is False
+    run(FakeAsana(fail_on=('P2', 'o2')), resume=False, sent=sent)
+
+    fake = FakeAsana()
+    with patch.object(module, 'run_script', side_effect=lambda resume: run(fake, resume, sent)):
+        assert module.resume_interrupted_run() is True
+    assert fake.calls == [('https://app.asana.com/api/1.0/tasks', 'P2', 'o2')]
+    assert not os.path.exists(module.checkpoint_file)
+
+
+def test_overlapping_runs_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'checkpoint_file', str(tmp_path / 'checkpoint.json'))
+    scheduler = module.schedule.Scheduler()
+    monkeypatch.setattr(module.schedule, 'every', scheduler.every)
+    fake = FakeAsana()
+
+    with module.run_lock:
+        with patch('requests.get', side_effect=fake.get):
+            assert module.run_script() is False
+            module.scheduled_run()
+    assert fake.calls == []
+    assert scheduler.jobs == []
+
+
+def test_startup_resume_does_not_block_http_server(monkeypatch):
+    http_started = threading.Event()
+    resume_started = threading.Event()
+    finish_resume = threading.Event()
+
+    def resume():
+        resume_started.set()
+        finish_resume.wait(5)
+
+    monkeypatch.setattr(module.parser, 'parse_args', lambda: argparse.Namespace(run_now=False, resume=False))
+    monkeypatch.setattr(module, 'delivery_worker', lambda: None)
+    monkeypatch.setattr(module, 'load_watched_projects', lambda: None)
+    monkeypatch.setattr(module, 'serve_http', http_started.set)
+    monkeypatch.setattr(module, 'resume_interrupted_run', resume)
+    monkeypatch.setattr(module.schedule, 'every', module.schedule.Scheduler().every)
+    monkeypatch.setattr(module.schedule, 'run_pending', Mock(side_effect=KeyboardInterrupt))
+
+    # main() reaches the scheduler loop while the resumed run is still going
+    with pytest.raises(KeyboardInterrupt):
+        module.main()
+    assert http_started.wait(1)
+    assert resume_started.wait(1)
+    finish_resume.set()
@@ -0,0 +1,178 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+import requests
+
+# Import the module from the script file
+spec = importlib.util.spec_from_file_location(
+    'asana_notification', os.path.join(os.path.dirname(__file__), '..', 'asana-notification.py')
+)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+DUE = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
+
+
+class FakeAsanaHandler(BaseHTTPRequestHandler):
+    """Asana stand-in; project ``stall`` hangs and ``slow`` is slow once.
+
+    Setting ``stall_teams`` makes the team listing hang as well.
+    """
+
+    calls = []
+    stall_teams = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        project = query.get('project', [None])[0]
+        self.calls.append((url.path, project))
+
+        if url.path.endswith('/workspaces'):
+            payload = {'data': [{'gid': 'w1'}]}
+        elif url.path.endswith('/teams'):
+            if self.stall_teams:
+                time.sleep(3)
+            payload = {'data': [{'gid': 't1', 'name': 'Website Builds'}]}
+        elif url.path.endswith('/projects'):
+            payload = {'data': [
+                {'gid': 'ok', 'name': 'Project OK'},
+                {'gid': 'stall', 'name': 'Project Stall'},
+                {'gid': 'later', 'name': 'Project Later'},
+            ]}
+        else:
+            if project == 'stall':
+                time.sleep(3)
+            if project == 'slow' and self.calls.count((url.path, 'slow')) == 1:
+                time.sleep(3)
+            payload = {'data': [{
+                'name': f'Task {project}',
+                'due_on': DUE,
+                'assignee': {'name': 'Alice'},
+                'permalink_url': f'http://example.com/{project}',
+                'resource_subtype': 'default_task',
+            }]}
+
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass  # The client gave up on a stalled request
+
+
+@pytest.fixture
+def fake_asana(monkeypatch):
+    server = ThreadingHTTPServer(('localhost', 0), FakeAsanaHandler)
+    server.daemon_threads = True
+    FakeAsanaHandler.calls = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(module, 'asana_api_url', f'http://localhost:{server.server_address[1]}')
+    monkeypatch.setattr(module, 'asana_access_token', 'token')
+    monkeypatch.setattr(module, 'page_latency', module.LatencyTracker())
+    yield FakeAsanaHandler
+    server.shutdown()
+    thread.join()
+
+
+def test_stalled_request_times_out(fake_asana, monkeypatch):
+    monkeypatch.setattr(module, 'asana_read_timeout', 0.2)
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        module.fetch_page(f'{module.asana_api_url}/tasks', {'project': 'stall'})
+    assert time.monotonic() - start < 2
+
+
+def test_slow_page_request_is_hedged(fake_asana):
+    for _ in range(module.hedge_min_samples):
+        module.page_latency.record(0.05)
+
+    start = time.monotonic()
+    response = module.fetch_page(f'{module.asana_api_url}/tasks', {'project': 'slow'})
+    assert response.json()['data'][0]['name'] == 'Task slow'
+    assert time.monotonic() - start < 2
+    assert fake_asana.calls.count(('/tasks', 'slow')) == 2
+
+
+def test_hedge_success_wins_when_both_finish_together(monkeypatch):
+    failed = Future()
+    failed.set_exception(requests.Timeout())
+    succeeded = Future()
+    succeeded.set_result('page')
+    submitted = iter([failed, succeeded])
+    monkeypatch.setattr(module, 'asana_executor', Mock(submit=lambda fn: next(submitted)))
+    monkeypatch.setattr(module, 'page_latency', module.LatencyTracker())
+    for _ in range(module.hedge_min_samples):
+        module.page_latency.record(0.05)
+
+    waits = []
+
+    def fake_wait(futures, timeout=None, return_when=None):
+        waits.append(futures)
+        if len(waits) == 1:
+            return set(), set(futures)  # The primary request looks slow
+        return [failed, succeeded], set()  # Both finish, failed one first
+
+    monkeypatch.setattr(module, 'wait', fake_wait)
+    assert module.fetch_page('http://asana.invalid/tasks', {}) == 'page'
+
+
+def test_run_deadline_sends_partial_report(fake_asana, tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'checkpoint_file', str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setattr(module, 'watched_projects_file', str(tmp_path / 'watched.json'))
+    monkeypatch.setattr(module, 'args', argparse.Namespace(max_projects=None))
+    monkeypatch.setattr(module, 'run_deadline', 1.0)
+    sent = []
+    monkeypatch.setattr(module, 'enqueue_report', lambda t, m, u: sent.append((t, m, u)))
+
+    start = time.monotonic()
+    module.run_script()
+    assert time.monotonic() - start < 2.5
+
+    tasks, _, unfetched = sent[0]
+    assert [t[0] for t in tasks] == ['Task ok']
+    assert unfetched == ['Project Stall', 'Project Later']
+    assert module.script_progress['partial'] is True
+    assert module.script_progress['error'] is None
+    assert ('/tasks', 'later') not in fake_asana.calls
+    assert os.path.exists(module.checkpoint_file)
+
+
+def test_stalled_project_listing_sends_partial_report(fake_asana, tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'checkpoint_file', str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setattr(module, 'watched_projects_file', str(tmp_path / 'watched.json'))
+    monkeypatch.setattr(module, 'args', argparse.Namespace(max_projects=None))
+    monkeypatch.setattr(module, 'asana_read_timeout', 0.2)
+    monkeypatch.setattr(fake_asana, 'stall_teams', True)
+    sent = []
+    monkeypatch.setattr(module, 'enqueue_report', lambda t, m, u: sent.append((t, m, u)))
+
+    module.run_script()
+
+    assert sent == [([], [], ['All projects (teams could not be fetched)'])]
+    assert module.script_progress['partial'] is True
+    assert module.script_progress['error'] is None
+
+
+def test_partial_report_lists_unfetched_projects():
+    html = module.build_email_html([], [], ['Project Stall'])
+    assert 'Partial report' in html
+    assert '<li>Project Stall</li>' in html
+    assert module.report_subject(['Project Stall']).endswith('(partial)')
@@ -0,0 +1,88 @@
+import datetime
+import importlib.util
+import os
+import threading
+import time
+from unittest.mock import patch
+
+# Import the module from the script file
+spec = importlib.util.spec_from_file_location(
+    'asana_notification', os.path.join(os.path.dirname(__file__), '..', 'asana-notification.py')
+)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+TASKS = [('Task1', datetime.date(2023, 9, 10), 'Alice', 'http://example.com/1', 'Project A')]
+
+
+def queued_jobs():
+    return [n for n in os.listdir(module.delivery_queue_dir) if n.endswith('.json')]
+
+
+def test_file_sink_delivers_queued_report(tmp_path, monkeypatch):
+    monkeypatch.setenv('DELIVERY_FILE_DIR', str(tmp_path / 'reports'))
+    monkeypatch.setattr(module, 'delivery_queue_dir', str(tmp_path / 'queue'))
+    monkeypatch.setattr(module, 'delivery_sinks', ['file'])
+
+    module.enqueue_report(TASKS, [])
+    assert len(queued_jobs()) == 1
+
+    assert module.deliver_pending() == 1
+    assert queued_jobs() == []
+    reports = os.listdir(tmp_path / 'reports')
+    assert len(reports) == 1
+    assert 'Task1' in (tmp_path / 'reports' / reports[0]).read_text()
+
+
+def test_failed_delivery_is_retried_with_backoff(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'delivery_queue_dir', str(tmp_path / 'queue'))
+    monkeypatch.setattr(module, 'delivery_sinks', ['webhook', 'file'])
+    monkeypatch.setattr(module, 'delivery_max_attempts', 2)
+    monkeypatch.setenv('DELIVERY_FILE_DIR', str(tmp_path / 'reports'))
+    failing = patch.dict(module.DELIVERY_SINKS, {'webhook': lambda *report: 1 / 0})
+
+    with failing:
+        module.enqueue_report(TASKS, [])
+        assert module.deliver_pending() == 2
+        # The file sink succeeded; the webhook job waits for its backoff
+        assert len(queued_jobs()) == 1
+        assert module.deliver_pending() == 0
+
+        with patch('time.time', return_value=module.time.time() + 3600):
+            assert module.deliver_pending() == 1
+    assert queued_jobs() == []
+    assert len(os.listdir(tmp_path / 'queue' / 'failed')) == 1
+
+
+def test_jobs_waiting_for_backoff_are_not_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'delivery_queue_dir', str(tmp_path / 'queue'))
+    os.makedirs(tmp_path / 'queue')
+    later = int((module.time.time() + 3600) * 1000)
+    (tmp_path / 'queue' / f'{later}-file-001-abcdef12.json').write_text('not json')
+
+    with patch('builtins.open', side_effect=AssertionError('job file was read')):
+        assert module.deliver_pending() == 0
+
+
+def test_delivery_concurrency_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'delivery_queue_dir', str(tmp_path / 'queue'))
+    monkeypatch.setattr(module, 'delivery_sinks', ['webhook'])
+    monkeypatch.setattr(module, 'delivery_concurrency', 2)
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def slow_sink(*report):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+
+    for _ in range(6):
+        module.enqueue_report(TASKS, [])
+    with patch.dict(module.DELIVERY_SINKS, {'webhook': slow_sink}):
+        assert module.deliver_pending() == 6
+    assert max(peak) == 2
+    assert queued_jobs() == []
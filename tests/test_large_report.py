@@ -0,0 +1,152 @@
+import base64
+import datetime
+import email
+import importlib.util
+import io
+import os
+import re
+import tempfile
+import tracemalloc
+from email.mime.text import MIMEText
+from unittest.mock import MagicMock, Mock, patch
+
+# Import the module from the script file
+spec = importlib.util.spec_from_file_location(
+    'asana_notification', os.path.join(os.path.dirname(__file__), '..', 'asana-notification.py')
+)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+
+def make_items(count, projects=20):
+    return [
+        (
+            f'Task {i} with a reasonably long descriptive name',
+            datetime.date(2023, 9, 1) + datetime.timedelta(days=i % 20),
+            f'Assignee {i % 7}',
+            f'https://app.asana.com/0/{i}/{i * 7}',
+            f'Project {i % projects}',
+        )
+        for i in range(count)
+    ]
+
+
+def test_streamed_message_matches_report_html():
+    tasks = make_items(50)
+    milestones = make_items(5)[:2]
+    out = io.BytesIO()
+    module.write_mime_message(out, module.iter_email_html(tasks, milestones), 'Subject')
+    message = email.message_from_bytes(out.getvalue())
+    assert message['subject'] == 'Subject'
+    assert message.get_content_type() == 'text/html'
+    assert message.get_payload(decode=True).decode('utf-8') == module.build_email_html(tasks, milestones)
+
+
+def test_split_report_keeps_parts_under_limit():
+    tasks = make_items(2000)
+    milestones = make_items(30)
+    max_bytes = 400 * 1024
+    parts = module.split_report(tasks, milestones, max_bytes)
+    assert len(parts) > 1
+    for part_tasks, part_milestones in parts:
+        out = io.BytesIO()
+        module.write_mime_message(out, module.iter_email_html(part_tasks, part_milestones), 'Subject')
+        assert len(out.getvalue()) <= max_bytes
+    assert sorted(t for part, _ in parts for t in part) == sorted(tasks)
+    assert sorted(m for _, part in parts for m in part) == sorted(milestones)
+
+
+def test_small_report_is_not_split():
+    tasks = make_items(10)
+    assert module.split_report(tasks, [], module.GMAIL_MAX_MESSAGE_BYTES) == [(tasks, [])]
+
+
+def test_streaming_memory_benchmark():
+    # Roughly a 6 MB HTML report
+    tasks = make_items(12000)
+    milestones = []
+
+    tracemalloc.start()
+    html = module.build_email_html(tasks, milestones)
+    message = MIMEText(html, 'html')
+    raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+    _, legacy_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report_size = len(html)
+    del html, message, raw_message
+
+    tracemalloc.start()
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+        module.write_mime_message(spool, module.iter_email_html(tasks, milestones), 'Subject')
+    _, streaming_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert report_size > 5 * 1024 * 1024
+    assert streaming_peak * 4 < legacy_peak
+
+
+def test_split_report_is_queued_one_job_per_part(tmp_path, monkeypatch):
+    monkeypatch.setenv('WEB_CLIENT_ID', 'id')
+    monkeypatch.setenv('WEB_CLIENT_SECRET', 'secret')
+    monkeypatch.setenv('WEB_TOKEN_URI', 'https://oauth2.googleapis.com/token')
+    monkeypatch.setattr(module, 'delivery_queue_dir', str(tmp_path / 'queue'))
+    monkeypatch.setattr(module, 'delivery_sinks', ['gmail'])
+    monkeypatch.setitem(module.SINK_MAX_MESSAGE_BYTES, 'gmail', 400 * 1024)
+    monkeypatch.setattr(module, 'Credentials', Mock())
+    module.Credentials.from_authorized_user_info.return_value.expired = False
+    service = Mock()
+    uploads = []
+
+    def send(userId, body, media_body):
+        subject = email.message_from_bytes(media_body.getbytes(0, media_body.size()))['subject']
+        uploads.append(subject)
+        if '(part 2/' in subject and uploads.count(subject) == 1:
+            raise ConnectionError('upload interrupted')
+        return Mock()
+
+    service.users.return_value.messages.return_value.send.side_effect = send
+    monkeypatch.setattr(module, 'build', lambda *a, **kw: service)
+
+    module.enqueue_report(make_items(2000), [])
+    parts = len(os.listdir(tmp_path / 'queue'))
+    assert parts > 2
+    assert module.deliver_pending() == parts
+    subjects = [f'Overdue Asana Tasks and Milestones (part {n}/{parts})' for n in range(1, parts + 1)]
+    assert sorted(uploads) == sorted(subjects)
+
+    # Only the failed part is sent again
+    with patch('time.time', return_value=module.time.time() + 3600):
+        assert module.deliver_pending() == 1
+    assert uploads[parts:] == [subjects[1]]
+    assert os.listdir(tmp_path / 'queue') == []
+
+
+def test_smtp_and_file_sinks_stream_split_parts(tmp_path, monkeypatch):
+    monkeypatch.setenv('SMTP_HOST', 'smtp.example.com')
+    monkeypatch.setenv('DELIVERY_FILE_DIR', str(tmp_path / 'reports'))
+    monkeypatch.setattr(module, 'delivery_queue_dir', str(tmp_path / 'queue'))
+    monkeypatch.setattr(module, 'delivery_sinks', ['smtp', 'file'])
+    monkeypatch.setitem(module.SINK_MAX_MESSAGE_BYTES, 'smtp', 400 * 1024)
+    monkeypatch.setitem(module.SINK_MAX_MESSAGE_BYTES, 'file', 400 * 1024)
+    smtp = MagicMock()
+    sent = []
+    # A plain function, since parts are delivered from several threads at once
+    smtp.return_value.__enter__.return_value.sendmail = lambda from_addr, to_addrs, raw: sent.append(raw)
+    monkeypatch.setattr(module.smtplib, 'SMTP', smtp)
+    tasks = make_items(2000)
+
+    module.enqueue_report(tasks, [])
+    module.deliver_pending()
+
+    assert len(sent) > 1
+    # SMTP data must use CRLF line endings throughout
+    assert not any(re.search(rb'(?<!\r)\n', raw) for raw in sent)
+    assert all(len(raw) <= 400 * 1024 for raw in sent)
+    messages = [email.message_from_bytes(raw) for raw in sent]
+    assert sorted(m['subject'] for m in messages)[0] == f'Overdue Asana Tasks and Milestones (part 1/{len(sent)})'
+    html = ''.join(m.get_payload(decode=True).decode('utf-8') for m in messages)
+    assert all(t[0] in html for t in tasks)
+
+    reports = sorted(os.listdir(tmp_path / 'reports'))
+    assert len(reports) == len(sent)
+    assert reports[0].endswith(f'-part1of{len(sent)}.html')
@@ -0,0 +1,167 @@
+import datetime
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlencode
+
+import pytest
+
+# Import the module from the script file
+spec = importlib.util.spec_from_file_location(
+    'asana_notification', os.path.join(os.path.dirname(__file__), '..', 'asana-notification.py')
+)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+TODAY = datetime.date(2023, 10, 2)
+
+
+def build_index():
+    tasks = [
+        ('Task1', datetime.date(2023, 9, 30), 'Alice', 'http://example.com/1', 'Project A'),
+        ('Task2', datetime.date(2023, 9, 20), 'Bob', 'http://example.com/2', 'Project A'),
+        ('Task3', datetime.date(2023, 9, 1), 'Alice', 'http://example.com/3', 'Project B'),
+    ]
+    milestones = [
+        ('Milestone1', datetime.date(2023, 9, 10), 'Alice', 'http://example.com/m1', 'Project A'),
+    ]
+    index = module.OverdueIndex()
+    index.load(tasks, milestones)
+    return index
+
+
+def test_query_by_assignee_sorted_by_age():
+    data = json.loads(build_index().query(assignee='Alice', today=TODAY))
+    assert [i['name'] for i in data['items']] == ['Task3', 'Milestone1', 'Task1']
+    assert data['items'][1]['type'] == 'Milestone'
+    assert data['total'] == 3
+    assert data['buckets'] == {'15+': 2, '1-7': 1}
+
+
+def test_query_by_assignee_and_project_with_min_days():
+    data = json.loads(build_index().query(assignee='Alice', project='Project A', min_days=10, today=TODAY))
+    assert [i['name'] for i in data['items']] == ['Milestone1']
+    assert data['items'][0]['days_overdue'] == 22
+
+
+def test_query_pagination_with_cursor():
+    index = build_index()
+    first = json.loads(index.query(limit=3, today=TODAY))
+    assert len(first['items']) == 3
+    second = json.loads(index.query(limit=3, cursor=first['next_cursor'], today=TODAY))
+    assert [i['name'] for i in second['items']] == ['Task1']
+    assert second['next_cursor'] is None
+
+
+def test_cursor_is_stable_when_items_are_removed():
+    tasks = [
+        (f'T{i}', datetime.date(2023, 9, 1) + datetime.timedelta(days=i), 'Alice', f'http://example.com/{i}', 'Project A')
+        for i in range(10)
+    ]
+    index = module.OverdueIndex()
+    index.load(tasks, [])
+    first = json.loads(index.query(limit=5, today=TODAY))
+    assert [i['name'] for i in first['items']] == ['T0', 'T1', 'T2', 'T3', 'T4']
+
+    index.remove_task('2')
+    second = json.loads(index.query(limit=5, cursor=first['next_cursor'], today=TODAY))
+    assert [i['name'] for i in second['items']] == ['T5', 'T6', 'T7', 'T8', 'T9']
+
+
+def test_invalid_cursor_rejected():
+    with pytest.raises(ValueError):
+        build_index().query(cursor='not-a-cursor', today=TODAY)
+
+
+def test_unknown_assignee_returns_empty_page():
+    data = json.loads(build_index().query(assignee='Nobody', today=TODAY))
+    assert data['items'] == []
+    assert data['total'] == 0
+
+
+def test_update_task_replaces_entries_incrementally():
+    index = build_index()
+    moved = ('Task2', datetime.date(2023, 9, 30), 'Alice', 'http://example.com/2', 'Project B')
+    index.update_task('2', [('Task', moved)])
+    data = json.loads(index.query(assignee='Alice', project='Project B', today=TODAY))
+    assert [i['name'] for i in data['items']] == ['Task3', 'Task2']
+    assert json.loads(index.query(assignee='Bob', today=TODAY))['total'] == 0
+
+    index.remove_task('3')
+    assert [i['name'] for i in json.loads(index.query(project='Project B', today=TODAY))['items']] == ['Task2']
+
+
+def test_ages_are_computed_at_query_time():
+    index = build_index()
+    later = TODAY + datetime.timedelta(days=6)
+    data = json.loads(index.query(assignee='Alice', project='Project A', today=later))
+    assert [(i['name'], i['days_overdue'], i['bucket']) for i in data['items']] == [
+        ('Milestone1', 28, '15+'),
+        ('Task1', 8, '8-14'),
+    ]
+    assert json.loads(index.query(min_days=8, today=TODAY))['total'] == 3
+    assert json.loads(index.query(min_days=8, today=later))['total'] == 4
+
+
+def start_server():
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+    threading.Thread(target=module.serve_http, kwargs={'port': port, 'bind': 'localhost'}, daemon=True).start()
+    for _ in range(50):
+        try:
+            socket.create_connection(('localhost', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return port
+
+
+def get_overdue(port, query):
+    conn = http.client.HTTPConnection('localhost', port, timeout=5)
+    conn.request('GET', '/api/overdue?' + urlencode(query))
+    response = conn.getresponse()
+    data = json.loads(response.read().decode())
+    conn.close()
+    return response.status, data
+
+
+def test_overdue_endpoint_filters_and_pages(monkeypatch):
+    today = datetime.date.today()
+    index = module.OverdueIndex()
+    index.load([
+        (f'Task{days}', today - datetime.timedelta(days=days), 'Alice', f'http://example.com/{days}', 'Project A')
+        for days in (2, 5, 10, 20, 30)
+    ] + [('Other', today - datetime.timedelta(days=40), 'Bob', 'http://example.com/b', 'Project A')], [])
+    monkeypatch.setattr(module, 'overdue_index', index)
+    port = start_server()
+
+    status, data = get_overdue(port, {'assignee': 'Alice', 'min_days': 5, 'limit': 2})
+    assert status == 200
+    assert [i['name'] for i in data['items']] == ['Task30', 'Task20']
+    assert data['items'][0]['days_overdue'] == 30
+    assert data['total'] == 4
+
+    names = [i['name'] for i in data['items']]
+    while data['next_cursor']:
+        status, data = get_overdue(port, {'assignee': 'Alice', 'min_days': 5, 'limit': 2, 'cursor': data['next_cursor']})
+        assert status == 200
+        names += [i['name'] for i in data['items']]
+    assert names == ['Task30', 'Task20', 'Task10', 'Task5']
+
+
+def test_overdue_endpoint_rejects_bad_parameters(monkeypatch):
+    monkeypatch.setattr(module, 'overdue_index', build_index())
+    port = start_server()
+
+    status, data = get_overdue(port, {'cursor': 'not-a-cursor'})
+    assert status == 400
+    assert 'error' in data
+
+    status, data = get_overdue(port, {'min_days': 'ten'})
+    assert status == 400
+    assert 'error' in data
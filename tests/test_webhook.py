@@ -0,0 +1,168 @@
+import datetime
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import threading
+import time
+from unittest.mock import patch, Mock
+
+# Import the module and the webhook stand-in from their script files
+spec = importlib.util.spec_from_file_location(
+    'asana_notification', os.path.join(os.path.dirname(__file__), '..', 'asana-notification.py')
+)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+standin_spec = importlib.util.spec_from_file_location(
+    'webhook_standin', os.path.join(os.path.dirname(__file__), '..', 'scripts', 'webhook_standin.py')
+)
+standin = importlib.util.module_from_spec(standin_spec)
+standin_spec.loader.exec_module(standin)
+
+DUE = (module.overdue_cutoff() - datetime.timedelta(days=10)).isoformat()
+
+
+def start_server():
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+    threading.Thread(target=module.serve_http, kwargs={'port': port, 'bind': 'localhost'}, daemon=True).start()
+    for _ in range(50):
+        try:
+            socket.create_connection(('localhost', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return f'http://localhost:{port}/webhooks/asana'
+
+
+def fake_task_api(tasks):
+    def get(url, **kwargs):
+        gid = url.rsplit('/', 1)[-1]
+        resp = Mock()
+        if gid in tasks:
+            resp.status_code = 200
+            resp.json.return_value = {'data': tasks[gid]}
+        else:
+            resp.status_code = 404
+        return resp
+    return get
+
+
+def wait_for(predicate):
+    for _ in range(100):
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def names():
+    return [i['name'] for i in json.loads(module.overdue_index.query())['items']]
+
+
+def test_signed_events_update_overdue_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'webhook_secrets_file', str(tmp_path / 'secrets.json'))
+    monkeypatch.setattr(module, 'asana_access_token', 'token')
+    monkeypatch.setattr(module, 'watched_projects', {'P1': 'Project 1'})
+    module.overdue_index.load([], [])
+    url = start_server() + '/P1'
+
+    task = {
+        'name': 'Live task',
+        'due_on': DUE,
+        'assignee': {'name': 'Alice'},
+        'completed': False,
+        'permalink_url': 'https://app.asana.com/0/P1/111',
+        'resource_subtype': 'default_task',
+        'memberships': [{'project': {'gid': 'P1'}}, {'project': {'gid': 'other'}}],
+    }
+    tasks = {'111': task}
+
+    with patch('requests.get', side_effect=fake_task_api(tasks)):
+        assert standin.handshake(url, 'secret') == 200
+        assert module.load_webhook_secrets() == {'P1': 'secret'}
+
+        assert standin.post_events(url, 'secret', ['111']) == 200
+        assert wait_for(lambda: names() == ['Live task'])
+
+        task['completed'] = True
+        assert standin.post_events(url, 'secret', ['111']) == 200
+        assert wait_for(lambda: names() == [])
+
+        task['completed'] = False
+        standin.post_events(url, 'secret', ['111'])
+        assert wait_for(lambda: names() == ['Live task'])
+        standin.post_events(url, 'secret', ['111'], action='deleted')
+        assert wait_for(lambda: names() == [])
+
+
+def test_each_watched_project_has_its_own_secret(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'webhook_secrets_file', str(tmp_path / 'secrets.json'))
+    monkeypatch.setattr(module, 'watched_projects', {'P1': 'Project 1', 'P2': 'Project 2'})
+    base = start_server()
+
+    assert standin.handshake(base + '/P1', 'secret-1') == 200
+    assert standin.handshake(base + '/P2', 'secret-2') == 200
+    assert module.load_webhook_secrets() == {'P1': 'secret-1', 'P2': 'secret-2'}
+
+    assert standin.post_events(base + '/P2', 'secret-2', []) == 200
+    assert standin.post_events(base + '/P2', 'secret-1', []) == 401
+
+
+def test_unsigned_events_and_unknown_handshakes_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'webhook_secrets_file', str(tmp_path / 'secrets.json'))
+    monkeypatch.setattr(module, 'watched_projects', {'P1': 'Project 1'})
+    base = start_server()
+
+    assert standin.handshake(base + '/unwatched', 'attacker') == 403
+    assert standin.post_events(base + '/P1', 'wrong', ['111']) == 401
+    assert standin.handshake(base + '/P1', 'secret') == 200
+    assert standin.handshake(base + '/P1', 'attacker') == 403
+    assert standin.post_events(base + '/P1', 'wrong', ['111']) == 401
+    assert module.load_webhook_secrets() == {'P1': 'secret'}
+
+
+def test_watched_projects_survive_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'watched_projects_file', str(tmp_path / 'watched.json'))
+    monkeypatch.setattr(module, 'watched_projects', {'P1': 'Project 1'})
+    module.save_watched_projects()
+
+    monkeypatch.setattr(module, 'watched_projects', {})
+    module.load_watched_projects()
+    assert module.watched_projects == {'P1': 'Project 1'}
+
+
+def test_malformed_webhook_headers_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'webhook_secrets_file', str(tmp_path / 'secrets.json'))
+    monkeypatch.setattr(module, 'watched_projects', {'P1': 'Project 1'})
+    url = start_server() + '/P1'
+    assert standin.handshake(url, 'secret') == 200
+    host, port = url.split('/')[2].split(':')
+
+    def post(headers):
+        conn = http.client.HTTPConnection(host, int(port), timeout=5)
+        conn.putrequest('POST', '/webhooks/asana/P1')
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.endheaders(b'{}')
+        status = conn.getresponse().status
+        conn.close()
+        return status
+
+    assert post({'Content-Length': '2', 'X-Hook-Signature': 'caf\xe9'}) == 401
+    assert post({'Content-Length': 'two', 'X-Hook-Signature': 'abc'}) == 400
+    assert post({'Content-Length': '-1', 'X-Hook-Signature': 'abc'}) == 400
+
+
+def test_events_ignored_until_index_is_loaded(monkeypatch):
+    monkeypatch.setattr(module, 'overdue_index', module.OverdueIndex())
+    monkeypatch.setattr(module, 'watched_projects', {'P1': 'Project 1'})
+    get = Mock()
+
+    with patch('requests.get', get):
+        module.process_webhook_events([{'action': 'changed', 'resource': {'gid': '111', 'resource_type': 'task'}}])
+    get.assert_not_called()
+    assert names() == []